@@ -71,7 +71,8 @@ class FilmWork(UUIDMixin, TimeStampedMixin):
         return self.title
 
 
-class GenreFilmWork(UUIDMixin):
+class GenreFilmWork(models.Model):
+    id = models.BigAutoField(primary_key=True)
     film_work = models.ForeignKey('FilmWork', on_delete=models.CASCADE)
     genre = models.ForeignKey('Genre', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)  
@@ -86,7 +87,8 @@ class GenreFilmWork(UUIDMixin):
         return f'{self.film_work.title} - {self.genre.name}'
 
 
-class PersonFilmWork(UUIDMixin):
+class PersonFilmWork(models.Model):
+    id = models.BigAutoField(primary_key=True)
     film_work = models.ForeignKey('FilmWork', on_delete=models.CASCADE)
     person = models.ForeignKey('Person', on_delete=models.CASCADE)
     role = models.TextField(_('role'))
@@ -1,10 +1,14 @@
 import sqlite3
 import logging
-from contextlib import closing
-from typing import Generator, List, Dict, Any
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from datetime import date, datetime, timezone
+from itertools import islice
+from typing import Generator, Iterator, Iterable, List, Dict, Any, Callable, Optional, Tuple
 
 import psycopg
-from psycopg import ClientCursor
+from psycopg import sql
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,7 +16,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-BATCH_SIZE = 500
+# PostgreSQL перестаёт ускоряться после 1-10 тыс. строк в пачке, больше 10 тыс. выигрыша не даёт
+BATCH_SIZE = 10_000
+# Ограничение памяти на пачку нужно только для INSERT ... VALUES:
+# COPY пишет строки по одной и держит постоянный объём памяти
+MAX_BATCH_BYTES = 64 * 1024 * 1024
+BATCH_PROBE_ROWS = 100
+# Лимит протокола PostgreSQL на число параметров в одном запросе
+MAX_QUERY_PARAMS = 65_535
+# False — загрузка многострочными INSERT ... VALUES вместо COPY
+USE_COPY = True
+MAX_WORKERS = 4
+SQLITE_PATH = 'db.sqlite'
+# Только чтение: соединение ничего не пишет, поэтому журнал и синхронизацию не трогаем
+# (PRAGMA journal_mode = OFF на БД в режиме WAL с mode=ro падает с disk I/O error)
+SQLITE_URI = f'file:{SQLITE_PATH}?mode=ro'
+SQLITE_PRAGMAS = """
+    PRAGMA cache_size = -262144;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA mmap_size = 1073741824;
+"""
 DSL = {
     'dbname': 'movies_database',
     'user': 'app', 
@@ -31,6 +54,27 @@ TABLE_MAPPING = {
 
 MIGRATION_ORDER = ['genre', 'person', 'film_work', 'genre_film_work', 'person_film_work']
 
+MIGRATION_DEPENDENCIES = {
+    'film_work': ['genre', 'person'],
+    'genre_film_work': ['film_work', 'genre'],
+    'person_film_work': ['film_work', 'person']
+}
+
+DEFERRED_FK_TABLES = ['genre_film_work', 'person_film_work']
+
+# Суррогатный ключ M2M-таблиц (BigAutoField) генерирует PostgreSQL. Колонка не переносится
+# из SQLite, только если в целевой схеме у неё действительно есть DEFAULT или IDENTITY,
+# иначе (старая схема с id uuid) она копируется как раньше
+GENERATED_COLUMNS = {
+    'genre_film_work': ['id'],
+    'person_film_work': ['id']
+}
+
+CONFLICT_TARGETS = {
+    'genre_film_work': ['film_work_id', 'genre_id'],
+    'person_film_work': ['film_work_id', 'person_id', 'role']
+}
+
 NULLABLE_FIELDS = {
     'genre': ['description'],
     'film_work': ['description', 'creation_date', 'file_path', 'rating'],
@@ -48,11 +92,94 @@ FIELD_TYPES = {
     }
 }
 
+COMMON_FIELD_TYPES = {
+    'id': 'uuid',
+    'film_work_id': 'uuid',
+    'genre_id': 'uuid',
+    'person_id': 'uuid',
+    'created_at': 'timestamp',
+    'updated_at': 'timestamp'
+}
+
+PG_TYPES = {
+    'uuid': 'uuid',
+    'text': 'text',
+    'date': 'date',
+    'float': 'float8',
+    'timestamp': 'timestamptz'
+}
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Разбор временной метки SQLite; без часового пояса считаем UTC"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+# Выражения для генерации кодировщика строки; {v} — локальная переменная колонки.
+# text: None -> '' (NOT NULL в PostgreSQL); date/float: None и пустые строки -> NULL
+FIELD_ENCODERS = {
+    'uuid': "None if {v} is None else UUID({v})",
+    'text': "'' if {v} is None else {v}",
+    'date': "None if {v} is None or (type({v}) is str and (not {v} or {v}.isspace())) else parse_date({v})",
+    'float': "None if {v} is None or (type({v}) is str and (not {v} or {v}.isspace())) else float({v})",
+    'timestamp': "None if {v} is None else parse_timestamp({v})"
+}
+
+ENCODER_NAMESPACE = {
+    'UUID': uuid.UUID,
+    'parse_date': date.fromisoformat,
+    'parse_timestamp': parse_timestamp
+}
+
+_row_encoders: Dict[Tuple[str, ...], Callable[[Tuple[Any, ...]], Tuple[Any, ...]]] = {}
+
+
+def compile_row_encoder(field_types: Tuple[str, ...]) -> Callable[[Tuple[Any, ...]], Tuple[Any, ...]]:
+    """Генерация линейной функции кодирования строки под фиксированный набор типов"""
+    if field_types not in _row_encoders:
+        names = [f"v{i}" for i in range(len(field_types))]
+        expressions = [FIELD_ENCODERS[field_type].format(v=name) for name, field_type in zip(names, field_types)]
+        source = (
+            f"def encode(row):\n"
+            f"    {', '.join(names)}, = row\n"
+            f"    return ({', '.join(expressions)},)\n"
+        )
+        namespace = dict(ENCODER_NAMESPACE)
+        exec(compile(source, f"<row encoder {field_types}>", "exec"), namespace)
+        _row_encoders[field_types] = namespace['encode']
+
+    return _row_encoders[field_types]
+
+
+def estimate_row_size(row: Tuple[Any, ...]) -> int:
+    """Грубая оценка размера строки в байтах"""
+    return sum(len(value) if isinstance(value, (str, bytes)) else 8 for value in row)
+
+
+def iter_batches(
+    rows: Iterable[Tuple[Any, ...]],
+    batch_size: int = BATCH_SIZE,
+    max_batch_bytes: int = MAX_BATCH_BYTES
+) -> Generator[List[Tuple[Any, ...]], None, None]:
+    """Нарезка потока строк на пачки для INSERT ... VALUES с ограничением по памяти"""
+    rows = iter(rows)
+    fetch_size = batch_size
+    # Размер пачки оцениваем по первым строкам до того, как читать её целиком
+    while batch := list(islice(rows, min(BATCH_PROBE_ROWS, fetch_size))):
+        avg_row_bytes = max(1, sum(estimate_row_size(row) for row in batch) // len(batch))
+        fetch_size = max(1, min(batch_size, max_batch_bytes // avg_row_bytes))
+        if fetch_size > len(batch):
+            batch.extend(islice(rows, fetch_size - len(batch)))
+        yield batch
+
 
 class SQLiteLoader:
     def __init__(self, connection: sqlite3.Connection):
         self.conn = connection
-        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SQLITE_PRAGMAS)
 
     def get_table_names(self) -> List[str]:
         """Получение списка всех таблиц в SQLite"""
@@ -65,29 +192,25 @@ class SQLiteLoader:
             logger.error(f"Error getting table names: {e}")
             return []
 
-    def load_table_data(self, table_name: str, batch_size: int = BATCH_SIZE) -> Generator[List[Dict[str, Any]], None, None]:
-        """Загрузка данных из SQLite пачками"""
+    def load_table_data(
+        self,
+        table_name: str,
+        columns: List[str],
+        batch_size: int = BATCH_SIZE
+    ) -> Generator[Tuple[Any, ...], None, None]:
+        """Потоковое чтение строк из SQLite кортежами в порядке columns"""
         try:
             cursor = self.conn.cursor()
-            cursor.execute(f'SELECT * FROM "{table_name}"')
+            cursor.arraysize = batch_size
+            columns_str = ", ".join(f'"{col}"' for col in columns)
+            cursor.execute(f'SELECT {columns_str} FROM "{table_name}"')
             
-            while batch := cursor.fetchmany(batch_size):
-                yield [dict(row) for row in batch]
+            yield from cursor
                 
         except sqlite3.Error as e:
             logger.error(f"Error loading data from {table_name}: {e}")
             raise
 
-    def get_table_count(self, table_name: str) -> int:
-        """Получение количества записей в таблице"""
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(f'SELECT COUNT(*) FROM "{table_name}"')
-            return cursor.fetchone()[0]
-        except sqlite3.Error as e:
-            logger.error(f"Error getting count from {table_name}: {e}")
-            return 0
-
     def get_table_columns(self, table_name: str) -> List[str]:
         """Получение списка колонок таблицы"""
         try:
@@ -100,137 +223,403 @@ class SQLiteLoader:
 
 
 class PostgresSaver:
-    def __init__(self, connection: psycopg.Connection):
+    def __init__(
+        self,
+        connection: psycopg.Connection,
+        table_columns: Dict[str, List[str]],
+        use_copy: bool = USE_COPY
+    ):
         self.conn = connection
+        self.use_copy = use_copy
+        self.table_columns = table_columns
+        self._staging_tables = set()
+        self._insert_queries: Dict[Tuple[str, int], str] = {}
 
-    def convert_value(self, table_name: str, field_name: str, value: Any) -> Any:
-        """Конвертация значения в соответствии с типом поля"""
-        if value is None:
-            field_types = FIELD_TYPES.get(table_name, {})
-            field_type = field_types.get(field_name, 'text')
-            
-            if field_type == 'date':
-                return None  
-            elif field_type == 'float':
-                return None  
-            else:
-                return ''  
-        
-        if isinstance(value, str) and value.strip() == '':
-            field_types = FIELD_TYPES.get(table_name, {})
-            field_type = field_types.get(field_name, 'text')
-            
-            if field_type == 'date':
-                return None
-            elif field_type == 'float':
-                return None
-        
-        return value
+        # Все запросы собираются один раз, горячий путь только берёт готовый объект
+        self._pg_table_names: Dict[str, str] = {}
+        self._pg_types: Dict[str, List[str]] = {}
+        self._encoders: Dict[str, Callable[[Tuple[Any, ...]], Tuple[Any, ...]]] = {}
+        self._sql_count: Dict[str, sql.Composed] = {}
+        self._sql_analyze: Dict[str, sql.Composed] = {}
+        self._sql_create_staging: Dict[str, sql.Composed] = {}
+        self._sql_copy: Dict[str, sql.Composed] = {}
+        self._sql_insert: Dict[str, sql.Composed] = {}
+        self._sql_insert_values: Dict[str, sql.Composed] = {}
+        self._sql_row_placeholder: Dict[str, sql.Composed] = {}
+        self._sql_on_conflict: Dict[str, sql.Composed] = {}
+        self._sql_async_commit = sql.SQL("SET LOCAL synchronous_commit = off")
+        self._sql_reltuples = sql.SQL("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass")
 
-    def convert_row_values(self, table_name: str, row: Dict[str, Any]) -> Dict[str, Any]:
-        """Конвертация всех значений в строке"""
-        converted_row = {}
-        for key, value in row.items():
-            converted_row[key] = self.convert_value(table_name, key, value)
-        return converted_row
+        # Таблицы без колонок (ошибка чтения схемы или только генерируемый id) не готовим:
+        # migrate_table_data пропустит их с сообщением об ошибке
+        for table_name, columns in self.table_columns.items():
+            if columns:
+                self._prepare_table(table_name, columns)
 
-    def save_batch(self, table_name: str, columns: List[str], batch: List[Dict[str, Any]]):
-        """Сохранение пачки данных в PostgreSQL"""
-        try:
+    def _prepare_table(self, table_name: str, columns: List[str]):
+        """Предварительная сборка всех SQL-запросов для таблицы"""
+        pg_table_name = TABLE_MAPPING.get(table_name, table_name)
+        table = sql.Identifier('content', pg_table_name)
+        staging_table = sql.Identifier(f"tmp_{pg_table_name}")
+        columns_sql = sql.SQL(", ").join(map(sql.Identifier, columns))
+
+        conflict_target = sql.SQL(", ").join(map(sql.Identifier, CONFLICT_TARGETS.get(table_name, ['id'])))
+
+        self._pg_table_names[table_name] = pg_table_name
+        self._sql_on_conflict[table_name] = sql.SQL("ON CONFLICT ({}) DO NOTHING").format(conflict_target)
+        self._pg_types[table_name] = [PG_TYPES[self.get_field_type(table_name, col)] for col in columns]
+        self._encoders[table_name] = self._make_row_encoder(table_name, columns)
+        self._sql_count[table_name] = sql.SQL("SELECT COUNT(*) FROM {}").format(table)
+        self._sql_analyze[table_name] = sql.SQL("ANALYZE {}").format(table)
+        # Только переносимые колонки и без ограничений: генерируемый id в staging не нужен
+        self._sql_create_staging[table_name] = sql.SQL(
+            "CREATE TEMP TABLE IF NOT EXISTS {} ON COMMIT DELETE ROWS AS SELECT {} FROM {} WITH NO DATA"
+        ).format(staging_table, columns_sql, table)
+        self._sql_copy[table_name] = sql.SQL(
+            "COPY {} ({}) FROM STDIN WITH (FORMAT BINARY)"
+        ).format(staging_table, columns_sql)
+        self._sql_insert[table_name] = sql.SQL(
+            "INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} {on_conflict}"
+        ).format(
+            table=table,
+            columns=columns_sql,
+            staging=staging_table,
+            on_conflict=self._sql_on_conflict[table_name]
+        )
+        self._sql_insert_values[table_name] = sql.SQL("INSERT INTO {} ({}) VALUES ").format(table, columns_sql)
+        self._sql_row_placeholder[table_name] = sql.SQL("({})").format(
+            sql.SQL(", ").join([sql.Placeholder()] * len(columns))
+        )
+
+    def get_field_type(self, table_name: str, field_name: str) -> str:
+        """Получение типа поля"""
+        field_types = FIELD_TYPES.get(table_name, {})
+        return field_types.get(field_name) or COMMON_FIELD_TYPES.get(field_name, 'text')
+
+    def _make_row_encoder(
+        self,
+        table_name: str,
+        columns: List[str]
+    ) -> Callable[[Tuple[Any, ...]], Tuple[Any, ...]]:
+        """Получение функции, превращающей строку SQLite в кортеж для COPY"""
+        return compile_row_encoder(tuple(self.get_field_type(table_name, col) for col in columns))
+
+    def ensure_staging_table(self, table_name: str):
+        """Создание временной таблицы для COPY (один раз на соединение)"""
+        if table_name not in self._staging_tables:
             cursor = self.conn.cursor()
-            placeholders = ", ".join(["%s"] * len(columns))
-            columns_str = ", ".join(columns)
-            
-            pg_table_name = TABLE_MAPPING.get(table_name, table_name)
-            
-            sql = f"""
-                INSERT INTO content.{pg_table_name} ({columns_str})
-                VALUES ({placeholders})
-                ON CONFLICT (id) DO NOTHING
-            """
-            
-            values = []
-            for row in batch:
-                converted_row = self.convert_row_values(table_name, row)
-                row_values = [converted_row.get(col) for col in columns]
-                values.append(row_values)
-            
-            cursor.executemany(sql, values)
-            self.conn.commit()
-            
-            logger.info(f"Inserted {len(values)} rows into content.{pg_table_name}")
-            
-        except psycopg.Error as e:
-            self.conn.rollback()
-            logger.error(f"Error saving batch to {table_name}: {e}")
+            cursor.execute(self._sql_create_staging[table_name])
+            self._staging_tables.add(table_name)
+
+    def copy_stream(self, table_name: str, rows: Iterable[Tuple[Any, ...]]) -> Tuple[int, int]:
+        """Загрузка данных одним потоком бинарного COPY; возвращает (прочитано, вставлено)"""
+        copied_count = 0
+        cursor = self.conn.cursor()
+        encode = self._encoders[table_name]
+
+        self.ensure_staging_table(table_name)
+
+        with cursor.copy(self._sql_copy[table_name]) as copy:
+            copy.set_types(self._pg_types[table_name])
+            for row in rows:
+                copy.write_row(encode(row))
+                copied_count += 1
+                if copied_count % BATCH_SIZE == 0:
+                    logger.info(f"Copied {copied_count} rows into staging table for {table_name}")
+
+        cursor.execute(self._sql_insert[table_name])
+        return copied_count, cursor.rowcount
+
+    def insert_batch(self, table_name: str, batch: List[Tuple[Any, ...]]) -> int:
+        """Вставка пачки многострочными INSERT ... VALUES (...), (...)"""
+        cursor = self.conn.cursor()
+        encode = self._encoders[table_name]
+        rows_per_query = max(1, MAX_QUERY_PARAMS // len(self.table_columns[table_name]))
+        inserted_count = 0
+
+        for start in range(0, len(batch), rows_per_query):
+            chunk = batch[start:start + rows_per_query]
+            query = self.get_insert_query(table_name, len(chunk))
+            cursor.execute(query, [value for row in chunk for value in encode(row)], prepare=True)
+            inserted_count += cursor.rowcount
+
+        return inserted_count
+
+    def get_insert_query(self, table_name: str, rows_count: int) -> str:
+        """Текст INSERT на rows_count строк; кешируется уже отрендеренным, чтобы не собирать его заново"""
+        key = (table_name, rows_count)
+        if key not in self._insert_queries:
+            self._insert_queries[key] = sql.Composed([
+                self._sql_insert_values[table_name],
+                sql.SQL(", ").join([self._sql_row_placeholder[table_name]] * rows_count),
+                sql.SQL(" "),
+                self._sql_on_conflict[table_name]
+            ]).as_string(self.conn)
+        return self._insert_queries[key]
+
+    def save_stream(self, table_name: str, rows: Iterable[Tuple[Any, ...]]) -> Tuple[int, int]:
+        """Сохранение всех данных таблицы одной транзакцией; возвращает (прочитано, вставлено)"""
+        pg_table_name = self._pg_table_names[table_name]
+        try:
+            # При ошибке блок transaction() откатывает таблицу целиком — целевая схема пустая
+            with self.conn.transaction():
+                # Таблица грузится одной транзакцией без ожидания fsync WAL на COMMIT.
+                # При сбое сервера последняя таблица может потеряться, но загрузка
+                # идемпотентна (ON CONFLICT DO NOTHING) и просто перезапускается
+                self.conn.cursor().execute(self._sql_async_commit)
+
+                if self.use_copy:
+                    read_count, inserted_count = self.copy_stream(table_name, rows)
+                else:
+                    read_count = inserted_count = 0
+                    for batch in iter_batches(rows):
+                        inserted_count += self.insert_batch(table_name, batch)
+                        read_count += len(batch)
+                        logger.info(f"Read {read_count} rows from {table_name}")
+
+            logger.info(f"Inserted {inserted_count} rows into content.{pg_table_name}")
+            return read_count, inserted_count
+
+        except Exception as e:
+            # Временная таблица, созданная в откаченной транзакции, исчезает вместе с ней
+            self._staging_tables.clear()
+            logger.error(f"Error saving data to {table_name}: {e}")
             raise
 
     def get_table_count(self, table_name: str) -> int:
         """Получение количества записей в таблице PostgreSQL"""
         try:
             cursor = self.conn.cursor()
-            pg_table_name = TABLE_MAPPING.get(table_name, table_name)
-            cursor.execute(f"SELECT COUNT(*) FROM content.{pg_table_name}")
+            cursor.execute(self._sql_count[table_name])
             return cursor.fetchone()[0]
         except psycopg.Error as e:
             logger.error(f"Error getting count from {table_name}: {e}")
             return 0
 
+    def get_table_row_estimate(self, table_name: str) -> int:
+        """Оценка количества записей через ANALYZE и pg_class.reltuples без полного сканирования"""
+        try:
+            with self.conn.transaction():
+                cursor = self.conn.cursor()
+                cursor.execute(self._sql_analyze[table_name])
+                cursor.execute(self._sql_reltuples, (f"content.{self._pg_table_names[table_name]}",))
+                return cursor.fetchone()[0]
+        except psycopg.Error as e:
+            logger.error(f"Error estimating count for {table_name}: {e}")
+            return -1
+
+    def get_verified_count(self, table_name: str, read_count: int, inserted_count: int) -> int:
+        """Количество записей в PostgreSQL без полного сканирования, когда это возможно"""
+        # Всё прочитанное вставлено — таблица точно совпадает с SQLite, считать нечего
+        if inserted_count == read_count:
+            return inserted_count
+
+        # Часть строк уже была (повторный запуск): сначала дешёвая оценка reltuples,
+        # точный COUNT(*) — только если оценка не совпала
+        estimate = self.get_table_row_estimate(table_name)
+        if estimate == read_count:
+            return estimate
+
+        logger.info(f"reltuples for {table_name} ({estimate}) differs from {read_count}, counting exactly")
+        return self.get_table_count(table_name)
+
 
 def migrate_table_data(
     sqlite_loader: SQLiteLoader,
     postgres_saver: PostgresSaver,
     table_name: str
-):
-    """Миграция данных для конкретной таблицы"""
+) -> Optional[Tuple[int, int]]:
+    """Миграция данных для конкретной таблицы; возвращает (записей в SQLite, записей в PostgreSQL) или None, если таблица пропущена"""
     logger.info(f"Starting migration for table: {table_name}")
     
-    columns = sqlite_loader.get_table_columns(table_name)
+    columns = postgres_saver.table_columns.get(table_name)
     if not columns:
         logger.error(f"No columns found for {table_name}, skipping...")
-        return
-    
-    sqlite_count = sqlite_loader.get_table_count(table_name)
-    logger.info(f"Total records in SQLite {table_name}: {sqlite_count}")
-    
-    if sqlite_count == 0:
-        logger.warning(f"No data found in {table_name}, skipping...")
-        return
-    
-    migrated_count = 0
+        return None
     
     try:
-        for batch in sqlite_loader.load_table_data(table_name):
-            postgres_saver.save_batch(table_name, columns, batch)
-            migrated_count += len(batch)
-            if migrated_count % 1000 == 0:  
-                logger.info(f"Migrated {migrated_count}/{sqlite_count} records from {table_name}")
-            
+        read_count, inserted_count = postgres_saver.save_stream(
+            table_name, sqlite_loader.load_table_data(table_name, columns)
+        )
     except Exception as e:
         logger.error(f"Failed to migrate {table_name}: {e}")
         raise
     
-    logger.info(f"Finished migrating {migrated_count} records from {table_name}")
+    if read_count == 0:
+        logger.warning(f"No data found in {table_name}")
+    
+    logger.info(f"Finished migrating {table_name}: read {read_count}, inserted {inserted_count}")
     
-    postgres_count = postgres_saver.get_table_count(table_name)
-    if sqlite_count == postgres_count:
-        logger.info(f"✓ Successfully migrated {table_name}: {postgres_count} records")
-    else:
-        logger.warning(f"⚠ Data inconsistency in {table_name}: SQLite={sqlite_count}, PostgreSQL={postgres_count}")
+    postgres_count = postgres_saver.get_verified_count(table_name, read_count, inserted_count)
+    return read_count, postgres_count
+
+
+@contextmanager
+def deferred_foreign_keys(pg_conn: psycopg.Connection, table_names: List[str]) -> Iterator[None]:
+    """Снятие внешних ключей на время загрузки и их проверка одним проходом после"""
+    constraints = []
+    try:
+        cursor = pg_conn.cursor()
+        for table_name in table_names:
+            pg_table_name = TABLE_MAPPING.get(table_name, table_name)
+            cursor.execute(
+                """
+                SELECT conname, pg_get_constraintdef(oid)
+                FROM pg_constraint
+                WHERE conrelid = %s::regclass AND contype = 'f'
+                """,
+                (f"content.{pg_table_name}",)
+            )
+            constraints.extend(
+                (sql.Identifier('content', pg_table_name), pg_table_name, name, definition)
+                for name, definition in cursor.fetchall()
+            )
+
+        for table, pg_table_name, name, definition in constraints:
+            # Определения живут только в памяти процесса: если он упадёт до восстановления,
+            # ключи придётся вернуть вручную по этим строкам лога
+            logger.warning(
+                f"Dropping foreign key for bulk load: "
+                f"ALTER TABLE content.{pg_table_name} ADD CONSTRAINT {name} {definition}"
+            )
+            cursor.execute(
+                sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(table, sql.Identifier(name))
+            )
+        pg_conn.commit()
+        logger.info(f"Dropped {len(constraints)} foreign keys for bulk load")
+    except psycopg.Error as e:
+        pg_conn.rollback()
+        logger.error(f"Error dropping foreign keys: {e}")
+        raise
+
+    try:
+        yield
+    finally:
+        try:
+            cursor = pg_conn.cursor()
+            # NOT VALID не проверяет существующие строки, поэтому ключ возвращается мгновенно,
+            # а VALIDATE CONSTRAINT проверяет всю таблицу за один проход
+            for table, _, name, definition in constraints:
+                cursor.execute(
+                    sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {} NOT VALID").format(
+                        table, sql.Identifier(name), sql.SQL(definition)
+                    )
+                )
+            pg_conn.commit()
+
+            for table, _, name, _ in constraints:
+                cursor.execute(
+                    sql.SQL("ALTER TABLE {} VALIDATE CONSTRAINT {}").format(table, sql.Identifier(name))
+                )
+            pg_conn.commit()
+            logger.info(f"Restored and validated {len(constraints)} foreign keys")
+        except psycopg.Error as e:
+            pg_conn.rollback()
+            logger.error(f"Error restoring foreign keys: {e}")
+            raise
+
+
+def get_server_generated_columns(pg_conn: psycopg.Connection) -> Dict[str, List[str]]:
+    """Колонки из GENERATED_COLUMNS, которые PostgreSQL действительно заполняет сам"""
+    generated_columns = {}
+    try:
+        cursor = pg_conn.cursor()
+        for table_name, columns in GENERATED_COLUMNS.items():
+            cursor.execute(
+                """
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_schema = 'content' AND table_name = %s AND column_name = ANY(%s)
+                  AND (column_default IS NOT NULL OR is_identity = 'YES')
+                """,
+                (TABLE_MAPPING.get(table_name, table_name), columns)
+            )
+            generated_columns[table_name] = [row[0] for row in cursor.fetchall()]
+        pg_conn.commit()
+    except psycopg.Error as e:
+        pg_conn.rollback()
+        logger.error(f"Error reading column defaults: {e}")
+        raise
+    return generated_columns
+
+
+def connect_postgres() -> psycopg.Connection:
+    """Подключение к PostgreSQL с подготовкой запросов с первого выполнения"""
+    return psycopg.connect(**DSL, autocommit=False, prepare_threshold=0)
 
 
-def test_data_consistency(sqlite_conn: sqlite3.Connection, pg_conn: psycopg.Connection):
-    """Тестирование консистентности данных"""
+def configure_load_session(pg_conn: psycopg.Connection):
+    """Проверка настроек ввода-вывода сервера для сессии загрузки"""
+    try:
+        with pg_conn.transaction():
+            cursor = pg_conn.cursor()
+            # io_method меняется только при старте сервера: io_uring на PostgreSQL 18
+            # включается в postgresql.conf, здесь его можно лишь проверить
+            if pg_conn.info.server_version >= 180000:
+                cursor.execute("SHOW io_method")
+                io_method = cursor.fetchone()[0]
+                if io_method != 'io_uring':
+                    logger.info(
+                        f"PostgreSQL io_method is {io_method}; set io_method = io_uring "
+                        f"in postgresql.conf for faster bulk load"
+                    )
+    except psycopg.Error as e:
+        logger.warning(f"Could not configure load session: {e}")
+
+
+def migrate_table_worker(
+    table_name: str,
+    table_columns: Dict[str, List[str]],
+    dependencies: List[Future]
+) -> Optional[Tuple[int, int]]:
+    """Миграция таблицы в отдельном потоке со своими соединениями"""
+    for dependency in dependencies:
+        dependency.result()
+
+    with closing(sqlite3.connect(SQLITE_URI, uri=True, check_same_thread=False)) as sqlite_conn, \
+         closing(connect_postgres()) as pg_conn:
+        configure_load_session(pg_conn)
+        postgres_saver = PostgresSaver(pg_conn, {table_name: table_columns[table_name]})
+        return migrate_table_data(SQLiteLoader(sqlite_conn), postgres_saver, table_name)
+
+
+def migrate_tables_parallel(
+    table_columns: Dict[str, List[str]],
+    max_workers: int = MAX_WORKERS
+) -> Dict[str, Optional[Tuple[int, int]]]:
+    """Параллельная миграция независимых таблиц с учётом MIGRATION_DEPENDENCIES"""
+    futures: Dict[str, Future] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # MIGRATION_ORDER топологически отсортирован, поэтому родители всегда
+        # попадают в пул раньше детей и ожидание не блокирует все потоки
+        for table_name in MIGRATION_ORDER:
+            if table_name not in table_columns:
+                logger.warning(f"Table {table_name} not found in SQLite, skipping...")
+                continue
+
+            dependencies = [
+                futures[parent]
+                for parent in MIGRATION_DEPENDENCIES.get(table_name, [])
+                if parent in futures
+            ]
+            futures[table_name] = executor.submit(
+                migrate_table_worker, table_name, table_columns, dependencies
+            )
+
+        return {table_name: future.result() for table_name, future in futures.items()}
+
+
+def test_data_consistency(migration_counts: Dict[str, Optional[Tuple[int, int]]]):
+    """Тестирование консистентности данных по счётчикам, собранным во время загрузки"""
     logger.info("Testing data consistency...")
     
-    sqlite_loader = SQLiteLoader(sqlite_conn)
-    sqlite_tables = sqlite_loader.get_table_names()
-    postgres_saver = PostgresSaver(pg_conn)
-    
-    for table_name in sqlite_tables:
-        sqlite_count = sqlite_loader.get_table_count(table_name)
-        postgres_count = postgres_saver.get_table_count(table_name)
+    for table_name, counts in migration_counts.items():
+        if counts is None:
+            logger.error(f"✗ {table_name}: not migrated (inconsistent)")
+            continue
         
+        sqlite_count, postgres_count = counts
         if sqlite_count == postgres_count:
             logger.info(f"✓ {table_name}: {postgres_count} records (consistent)")
         else:
@@ -244,22 +633,26 @@ def main():
     try:
         logger.info("Starting data migration from SQLite to PostgreSQL...")
         
-        with closing(sqlite3.connect('db.sqlite')) as sqlite_conn, \
-             closing(psycopg.connect(**DSL, cursor_factory=ClientCursor)) as pg_conn:
+        with closing(sqlite3.connect(SQLITE_URI, uri=True)) as sqlite_conn, \
+             closing(connect_postgres()) as pg_conn:
             
             sqlite_loader = SQLiteLoader(sqlite_conn)
-            postgres_saver = PostgresSaver(pg_conn)
             
             table_names = sqlite_loader.get_table_names()
             logger.info(f"Found tables in SQLite: {table_names}")
+            generated_columns = get_server_generated_columns(pg_conn)
+            table_columns = {
+                table_name: [
+                    col for col in sqlite_loader.get_table_columns(table_name)
+                    if col not in generated_columns.get(table_name, [])
+                ]
+                for table_name in table_names
+            }
             
-            for table_name in MIGRATION_ORDER:
-                if table_name in table_names:
-                    migrate_table_data(sqlite_loader, postgres_saver, table_name)
-                else:
-                    logger.warning(f"Table {table_name} not found in SQLite, skipping...")
+            with deferred_foreign_keys(pg_conn, DEFERRED_FK_TABLES):
+                migration_counts = migrate_tables_parallel(table_columns)
             
-            test_data_consistency(sqlite_conn, pg_conn)
+            test_data_consistency(migration_counts)
             
             logger.info("Data migration completed successfully!")
             